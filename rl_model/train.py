@@ -11,13 +11,22 @@ import json
 import random
 import numpy as np
 import pandas as pd
+import bottleneck as bn
 from datetime import datetime
-from collections import deque
+from numpy.lib.stride_tricks import sliding_window_view
 
 import torch
 import torch.nn as nn
 import torch.optim as optim
 
+try:
+    from numba import njit
+except ImportError:  # Numba is optional; the backtest loops then run as plain Python
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda fn: fn
+
 # =========== CONFIG ===========
 TICKER = "SPY"
 PERIOD = "5y"
@@ -52,67 +61,99 @@ def fetch_data():
     return df
 
 
+def rolling_slope(values, window):
+    """OLS slope of every trailing window, zero-padded for the first window-1 bars.
+
+    x = arange(window) is fixed, so slope = sum((x - x_mean) * y) / Sxx and the
+    y mean term drops out (the centred x weights sum to zero).
+    """
+    values = np.asarray(values, dtype=float)
+    slopes = np.zeros(len(values))
+    if len(values) < window:
+        return slopes
+    x = np.arange(window) - (window - 1) / 2
+    sxx = np.sum(x * x)
+    windows = sliding_window_view(values, window)
+    slopes[window - 1:] = windows @ x / sxx
+    return slopes
+
+
+@njit(cache=True)
+def ema(values, span):
+    """Streaming EMA, equal to pandas ewm(span=span).mean() (adjust=True weights)."""
+    decay = 1.0 - 2.0 / (span + 1.0)
+    out = np.empty(len(values))
+    num = 0.0
+    den = 0.0
+    for i in range(len(values)):
+        num = values[i] + decay * num
+        den = 1.0 + decay * den
+        out[i] = num / den
+    return out
+
+
+def pct_change(values, periods):
+    """Fractional change over `periods` bars, NaN for the first `periods` bars."""
+    out = np.full(len(values), np.nan)
+    out[periods:] = values[periods:] / values[:-periods] - 1
+    return out
+
+
 def engineer_features(df):
     """Create technical indicator features."""
     d = df.copy()
-    c = d['Close']
+    close = d['Close'].to_numpy(np.float64)
+    high = d['High'].to_numpy(np.float64)
+    low = d['Low'].to_numpy(np.float64)
+    volume = d['Volume'].to_numpy(np.float64)
+    prev_close = np.concatenate(([np.nan], close[:-1]))
+    ind = {}
 
     # Moving Averages
-    d['SMA_10'] = c.rolling(10).mean()
-    d['SMA_30'] = c.rolling(30).mean()
-    d['SMA_50'] = c.rolling(50).mean()
+    ind['SMA_10'] = bn.move_mean(close, 10)
+    ind['SMA_30'] = bn.move_mean(close, 30)
+    ind['SMA_50'] = bn.move_mean(close, 50)
 
     # RSI
-    delta = c.diff()
-    gain = delta.clip(lower=0).rolling(14).mean()
-    loss = (-delta.clip(upper=0)).rolling(14).mean()
-    rs = gain / (loss + 1e-10)
-    d['RSI'] = 100 - (100 / (1 + rs))
+    delta = np.diff(close, prepend=close[0])
+    avg_gain = bn.move_mean(np.where(delta > 0, delta, 0.0), 14)
+    avg_loss = bn.move_mean(np.where(delta < 0, -delta, 0.0), 14)
+    ind['RSI'] = 100 - 100 / (1 + avg_gain / (avg_loss + 1e-10))
 
     # MACD
-    ema12 = c.ewm(span=12).mean()
-    ema26 = c.ewm(span=26).mean()
-    d['MACD'] = ema12 - ema26
-    d['MACD_signal'] = d['MACD'].ewm(span=9).mean()
+    macd = ema(close, 12) - ema(close, 26)
+    ind['MACD'] = macd
+    ind['MACD_signal'] = ema(macd, 9)
 
     # Bollinger Bands
-    bb_sma = c.rolling(20).mean()
-    bb_std = c.rolling(20).std()
-    d['BB_upper'] = bb_sma + 2 * bb_std
-    d['BB_lower'] = bb_sma - 2 * bb_std
-    d['BB_pct'] = (c - d['BB_lower']) / (d['BB_upper'] - d['BB_lower'] + 1e-10)
-
-    # ATR
-    high_low = d['High'] - d['Low']
-    high_close = (d['High'] - c.shift()).abs()
-    low_close = (d['Low'] - c.shift()).abs()
-    tr = pd.concat([high_low, high_close, low_close], axis=1).max(axis=1)
-    d['ATR'] = tr.rolling(14).mean()
+    bb_sma = bn.move_mean(close, 20)
+    bb_std = bn.move_std(close, 20, ddof=1)
+    bb_upper = bb_sma + 2 * bb_std
+    bb_lower = bb_sma - 2 * bb_std
+    ind['BB_upper'] = bb_upper
+    ind['BB_lower'] = bb_lower
+    ind['BB_pct'] = (close - bb_lower) / (bb_upper - bb_lower + 1e-10)
+
+    # ATR (fmax skips the missing previous close on the first bar)
+    high_low = high - low
+    high_close = np.abs(high - prev_close)
+    low_close = np.abs(low - prev_close)
+    tr = np.fmax(np.fmax(high_low, high_close), low_close)
+    ind['ATR'] = bn.move_mean(tr, 14)
 
     # Volume ratio
-    d['Vol_ratio'] = d['Volume'] / d['Volume'].rolling(20).mean()
+    ind['Vol_ratio'] = volume / bn.move_mean(volume, 20)
 
     # Price momentum
-    d['Return_1d'] = c.pct_change()
-    d['Return_5d'] = c.pct_change(5)
-    d['Return_10d'] = c.pct_change(10)
+    ind['Return_1d'] = pct_change(close, 1)
+    ind['Return_5d'] = pct_change(close, 5)
+    ind['Return_10d'] = pct_change(close, 10)
 
     # Linear regression slope (Jim Simons feature)
-    def rolling_slope(series, window):
-        slopes = []
-        for i in range(len(series)):
-            if i < window - 1:
-                slopes.append(0)
-            else:
-                y = series.iloc[i - window + 1:i + 1].values
-                x = np.arange(window)
-                slope = np.polyfit(x, y, 1)[0]
-                slopes.append(slope)
-        return pd.Series(slopes, index=series.index)
-
-    d['LR_slope_20'] = rolling_slope(c, 20)
-    d['LR_slope_50'] = rolling_slope(c, 50)
+    ind['LR_slope_20'] = rolling_slope(close, 20)
+    ind['LR_slope_50'] = rolling_slope(close, 50)
 
+    d = d.assign(**ind)
     d.dropna(inplace=True)
     return d
 
@@ -125,13 +166,12 @@ FEATURE_COLS = [
 
 
 def normalize_features(df):
-    """Min-max normalize features."""
-    features = df[FEATURE_COLS].copy()
-    for col in features.columns:
-        mn, mx = features[col].min(), features[col].max()
-        rng = mx - mn if mx - mn > 0 else 1
-        features[col] = (features[col] - mn) / rng
-    return features.values
+    """Min-max normalize features into a contiguous float32 array."""
+    arr = df[FEATURE_COLS].to_numpy(dtype=np.float32)
+    mn = arr.min(axis=0)
+    mx = arr.max(axis=0)
+    rng = np.where(mx > mn, mx - mn, 1.0).astype(np.float32)
+    return (arr - mn) / rng
 
 
 # =========== DQN MODEL ===========
@@ -155,22 +195,65 @@ class DQN(nn.Module):
 
 
 class ReplayBuffer:
-    def __init__(self, capacity=10000):
-        self.buffer = deque(maxlen=capacity)
+    """Circular replay buffer stored as contiguous per-field (SoA) arrays.
 
-    def push(self, state, action, reward, next_state, done):
-        self.buffer.append((state, action, reward, next_state, done))
+    The feature matrix is static during training, so transitions store state
+    indices into it and rows are gathered on the device at sample time.
+    """
+
+    def __init__(self, features, capacity=10000):
+        self.features = features
+        self.capacity = capacity
+        self.state_idx = np.empty(capacity, dtype=np.int32)
+        self.actions = np.empty(capacity, dtype=np.int64)
+        self.rewards = np.empty(capacity, dtype=np.float32)
+        self.next_state_idx = np.empty(capacity, dtype=np.int32)
+        self.dones = np.empty(capacity, dtype=np.float32)
+        self.pos = 0
+        self.size = 0
+        self._staging = None
+
+    def _staging_tensors(self, batch_size):
+        """Reusable host tensors for a sampled batch, page-locked when training on GPU."""
+        if self._staging is None or self._staging[1].shape[0] != batch_size:
+            pin = DEVICE.type == 'cuda'
+            self._staging = (
+                torch.empty((2, batch_size), dtype=torch.int32, pin_memory=pin),
+                torch.empty(batch_size, dtype=torch.int64, pin_memory=pin),
+                torch.empty(batch_size, dtype=torch.float32, pin_memory=pin),
+                torch.empty(batch_size, dtype=torch.float32, pin_memory=pin),
+            )
+        return self._staging
+
+    def push(self, state_idx, action, reward, next_state_idx, done):
+        self.state_idx[self.pos] = state_idx
+        self.actions[self.pos] = action
+        self.rewards[self.pos] = reward
+        self.next_state_idx[self.pos] = next_state_idx
+        self.dones[self.pos] = done
+        self.pos = (self.pos + 1) % self.capacity
+        self.size = min(self.size + 1, self.capacity)
 
     def sample(self, batch_size):
-        batch = random.sample(self.buffer, batch_size)
-        states, actions, rewards, next_states, dones = zip(*batch)
+        idx = np.random.randint(0, self.size, batch_size)
+        state_pairs, actions, rewards, dones = self._staging_tensors(batch_size)
+        np.take(self.state_idx, idx, out=state_pairs[0].numpy())
+        np.take(self.next_state_idx, idx, out=state_pairs[1].numpy())
+        np.take(self.actions, idx, out=actions.numpy())
+        np.take(self.rewards, idx, out=rewards.numpy())
+        np.take(self.dones, idx, out=dones.numpy())
+
+        # Async uploads from pinned memory; they are ordered before the kernels
+        # that consume them, and train_step's loss.item() syncs before the
+        # staging tensors are refilled on the next sample.
+        states, next_states = self.features[state_pairs.to(DEVICE, non_blocking=True)]
         return (
-            np.array(states), np.array(actions), np.array(rewards),
-            np.array(next_states), np.array(dones)
+            states, actions.to(DEVICE, non_blocking=True), rewards.to(DEVICE, non_blocking=True),
+            next_states, dones.to(DEVICE, non_blocking=True)
         )
 
     def __len__(self):
-        return len(self.buffer)
+        return self.size
 
 
 # =========== TRADING ENVIRONMENT ===========
@@ -181,15 +264,38 @@ class TradingEnv:
         self.features = features
         self.prices = prices
         self.initial_capital = initial_capital
+        # Trade log as parallel arrays; actions use the ACTIONS codes (1=BUY, 2=SELL)
+        self.trade_action = np.empty(len(prices), np.int8)
+        self.trade_idx = np.empty(len(prices), np.int64)
+        self.trade_price = np.empty(len(prices), np.float64)
+        self._portfolio_values = np.empty(len(features) + 1, np.float64)
         self.reset()
 
     def reset(self):
         self.step_idx = 0
         self.capital = self.initial_capital
         self.position = 0  # shares held
-        self.portfolio_values = [self.initial_capital]
-        self.trades = []
-        return self.features[0]
+        self._portfolio_values[0] = self.initial_capital
+        self._pv_idx = 1
+        self.n_trades = 0
+        return self.step_idx
+
+    @property
+    def portfolio_values(self):
+        """Portfolio value before the first step and after every step so far."""
+        return self._portfolio_values[:self._pv_idx]
+
+    @property
+    def trades(self):
+        """(actions, bar indices, prices) of the trades taken so far."""
+        n = self.n_trades
+        return self.trade_action[:n], self.trade_idx[:n], self.trade_price[:n]
+
+    def _record_trade(self, action, price):
+        self.trade_action[self.n_trades] = action
+        self.trade_idx[self.n_trades] = self.step_idx
+        self.trade_price[self.n_trades] = price
+        self.n_trades += 1
 
     def step(self, action):
         price = self.prices[self.step_idx]
@@ -201,17 +307,18 @@ class TradingEnv:
             if shares > 0:
                 self.position = shares
                 self.capital -= shares * price
-                self.trades.append(('BUY', self.step_idx, price))
+                self._record_trade(action, price)
 
         elif action == 2 and self.position > 0:  # SELL
             self.capital += self.position * price
-            self.trades.append(('SELL', self.step_idx, price))
+            self._record_trade(action, price)
             self.position = 0
 
         # Calculate portfolio value
         portfolio_value = self.capital + self.position * price
-        prev_value = self.portfolio_values[-1]
-        self.portfolio_values.append(portfolio_value)
+        prev_value = self._portfolio_values[self._pv_idx - 1]
+        self._portfolio_values[self._pv_idx] = portfolio_value
+        self._pv_idx += 1
 
         # Reward = normalized P&L change
         reward = (portfolio_value - prev_value) / prev_value * 100
@@ -219,62 +326,82 @@ class TradingEnv:
         self.step_idx += 1
         done = self.step_idx >= len(self.features) - 1
 
-        next_state = self.features[min(self.step_idx, len(self.features) - 1)]
-        return next_state, reward, done
+        next_state_idx = min(self.step_idx, len(self.features) - 1)
+        return next_state_idx, reward, done
 
 
 # =========== DQN AGENT ===========
 class DQNAgent:
-    def __init__(self, state_dim, action_dim=3, lr=1e-3, gamma=0.99, tau=0.005):
+    def __init__(self, features, action_dim=3, lr=1e-3, gamma=0.99, tau=0.005):
+        # Feature rows live on DEVICE; actions are selected by state index
+        self.features = features
+        state_dim = features.shape[1]
         self.policy_net = DQN(state_dim, action_dim).to(DEVICE)
         self.target_net = DQN(state_dim, action_dim).to(DEVICE)
         self.target_net.load_state_dict(self.policy_net.state_dict())
+        # The MLP is tiny, so on GPU kernel launches dominate; compiled CUDA graphs
+        # replay each fixed-shape forward in one launch. The plain modules are kept
+        # for parameters, train/eval mode and state_dict saving.
+        if DEVICE.type == 'cuda':
+            self.policy_q = torch.compile(self.policy_net, mode='reduce-overhead', fullgraph=True)
+            self.target_q = torch.compile(self.target_net, mode='reduce-overhead', fullgraph=True)
+        else:
+            self.policy_q, self.target_q = self.policy_net, self.target_net
         self.optimizer = optim.Adam(self.policy_net.parameters(), lr=lr)
-        self.buffer = ReplayBuffer()
+        self._policy_params = list(self.policy_net.parameters())
+        self._target_params = list(self.target_net.parameters())
+        # Mixed precision on GPU: bf16 where supported (no loss scaling needed),
+        # otherwise fp16 with a GradScaler. CPU training stays in fp32.
+        self.amp_dtype = None
+        if DEVICE.type == 'cuda':
+            self.amp_dtype = torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        self.scaler = torch.amp.GradScaler('cuda', enabled=self.amp_dtype == torch.float16)
+        self.buffer = ReplayBuffer(features)
         self.gamma = gamma
         self.tau = tau
         self.epsilon = 1.0
         self.epsilon_min = 0.01
-        self.epsilon_decay = 0.995
-        self.batch_size = 64
+        self.batch_size = 256
+        self.update_every = 4  # env steps per gradient update
+        # Decay is applied per update, so scale it to keep the per-step schedule
+        self.epsilon_decay = 0.995 ** self.update_every
 
-    def select_action(self, state, training=True):
+    def select_action(self, state_idx, training=True):
         if training and random.random() < self.epsilon:
             return random.randint(0, 2)
         with torch.no_grad():
-            state_t = torch.FloatTensor(state).unsqueeze(0).to(DEVICE)
-            q_values = self.policy_net(state_t)
+            q_values = self.policy_q(self.features[state_idx:state_idx + 1])
             return q_values.argmax(dim=1).item()
 
     def train_step(self):
         if len(self.buffer) < self.batch_size:
             return 0.0
 
-        states, actions, rewards, next_states, dones = self.buffer.sample(self.batch_size)
+        # Always a full batch (sampled with replacement), so compiled graphs never retrace
+        states_t, actions_t, rewards_t, next_states_t, dones_t = self.buffer.sample(self.batch_size)
 
-        states_t = torch.FloatTensor(states).to(DEVICE)
-        actions_t = torch.LongTensor(actions).to(DEVICE)
-        rewards_t = torch.FloatTensor(rewards).to(DEVICE)
-        next_states_t = torch.FloatTensor(next_states).to(DEVICE)
-        dones_t = torch.FloatTensor(dones).to(DEVICE)
+        with torch.autocast(device_type=DEVICE.type, dtype=self.amp_dtype,
+                            enabled=self.amp_dtype is not None):
+            # Current Q values
+            current_q = self.policy_q(states_t).gather(1, actions_t.unsqueeze(1)).squeeze()
 
-        # Current Q values
-        current_q = self.policy_net(states_t).gather(1, actions_t.unsqueeze(1)).squeeze()
+            # Target Q values
+            with torch.no_grad():
+                next_q = self.target_q(next_states_t).max(1)[0]
+                target_q = rewards_t + self.gamma * next_q * (1 - dones_t)
 
-        # Target Q values
-        with torch.no_grad():
-            next_q = self.target_net(next_states_t).max(1)[0]
-            target_q = rewards_t + self.gamma * next_q * (1 - dones_t)
+            loss = nn.MSELoss()(current_q.float(), target_q.float())
 
-        loss = nn.MSELoss()(current_q, target_q)
-        self.optimizer.zero_grad()
-        loss.backward()
-        torch.nn.utils.clip_grad_norm_(self.policy_net.parameters(), 1.0)
-        self.optimizer.step()
+        self.optimizer.zero_grad(set_to_none=True)
+        self.scaler.scale(loss).backward()
+        self.scaler.unscale_(self.optimizer)
+        torch.nn.utils.clip_grad_norm_(self._policy_params, 1.0)
+        self.scaler.step(self.optimizer)
+        self.scaler.update()
 
-        # Soft update target network
-        for target_param, policy_param in zip(self.target_net.parameters(), self.policy_net.parameters()):
-            target_param.data.copy_(self.tau * policy_param.data + (1 - self.tau) * target_param.data)
+        # Soft update target network: target += tau * (policy - target), fused across params
+        with torch.no_grad():
+            torch._foreach_lerp_(self._target_params, self._policy_params, self.tau)
 
         # Decay epsilon
         self.epsilon = max(self.epsilon_min, self.epsilon * self.epsilon_decay)
@@ -285,121 +412,171 @@ class DQNAgent:
 # =========== BACKTESTING ===========
 def backtest_dqn(agent, features, prices, dates):
     """Run trained DQN agent through historical data."""
+    # Greedy actions depend only on the feature row, so score every bar in one
+    # deterministic pass (eval mode disables dropout) and replay them in the env.
+    agent.policy_net.eval()
+    with torch.inference_mode():
+        actions = agent.policy_net(agent.features).argmax(dim=1).cpu().numpy()
+
     env = TradingEnv(features, prices, INITIAL_CAPITAL)
-    state = env.reset()
+    state_idx = env.reset()
     while True:
-        action = agent.select_action(state, training=False)
-        state, _, done = env.step(action)
+        state_idx, _, done = env.step(actions[state_idx])
         if done:
             break
     return env.portfolio_values, env.trades
 
 
-def backtest_hft(prices, volumes, dates):
-    """HFT Momentum backtest — VWAP deviation strategy."""
-    capital = INITIAL_CAPITAL
+@njit(cache=True)
+def _hft_loop(prices, vwap_devs, vol_ratios, tick_moms, start, capital0):
+    """HFT position state machine; signal arrays are indexed from bar `start`."""
+    n = len(prices)
+    portfolio = np.full(n + 1, capital0)
+    trade_actions = np.empty(n, np.int8)
+    trade_idx = np.empty(n, np.int64)
+    trade_prices = np.empty(n, np.float64)
+    n_trades = 0
+    capital = capital0
     position = 0
-    portfolio = [capital]
-    trades = []
-
-    for i in range(30, len(prices)):
-        # Calculate VWAP
-        recent_prices = prices[i-30:i]
-        recent_volumes = volumes[i-30:i]
-        vwap = np.sum(recent_prices * recent_volumes) / (np.sum(recent_volumes) + 1e-10)
 
-        vwap_dev = (prices[i] - vwap) / vwap * 100
-        avg_vol = np.mean(volumes[i-30:i-1])
-        vol_ratio = volumes[i] / (avg_vol + 1e-10)
-
-        # Tick momentum
-        tick_mom = np.sum(np.diff(prices[i-10:i+1]))
+    for i in range(start, n):
+        j = i - start
+        vwap_dev = vwap_devs[j]
+        vol_ratio = vol_ratios[j]
+        tick_mom = tick_moms[j]
 
         if vwap_dev < -0.2 and tick_mom > 0 and vol_ratio > 1.2 and position == 0:
             shares = int(capital * 0.95 / prices[i])
             if shares > 0:
                 position = shares
                 capital -= shares * prices[i]
-                trades.append(('BUY', i, prices[i]))
+                trade_actions[n_trades] = 1
+                trade_idx[n_trades] = i
+                trade_prices[n_trades] = prices[i]
+                n_trades += 1
         elif (vwap_dev > 0.2 or tick_mom < 0) and position > 0:
             capital += position * prices[i]
-            trades.append(('SELL', i, prices[i]))
+            trade_actions[n_trades] = 2
+            trade_idx[n_trades] = i
+            trade_prices[n_trades] = prices[i]
+            n_trades += 1
             position = 0
 
-        portfolio.append(capital + position * prices[i])
+        portfolio[i + 1] = capital + position * prices[i]
 
-    # Pad beginning
-    portfolio = [INITIAL_CAPITAL] * 30 + portfolio
-    return portfolio[:len(prices)+1], trades
+    return portfolio, trade_actions[:n_trades], trade_idx[:n_trades], trade_prices[:n_trades]
 
 
-def backtest_linreg(prices, dates):
-    """Jim Simons Linear Regression backtest."""
-    capital = INITIAL_CAPITAL
+@njit(cache=True)
+def _linreg_loop(prices, short_norms, long_norms, start, capital0):
+    """Linear regression position state machine; signals are indexed from bar `start`."""
+    n = len(prices)
+    portfolio = np.full(n + 1, capital0)
+    trade_actions = np.empty(n, np.int8)
+    trade_idx = np.empty(n, np.int64)
+    trade_prices = np.empty(n, np.float64)
+    n_trades = 0
+    capital = capital0
     position = 0
-    portfolio = [capital]
-    trades = []
-
-    for i in range(50, len(prices)):
-        closes = prices[i-50:i+1]
-
-        # Short regression (20)
-        y_short = closes[-20:]
-        x_short = np.arange(20)
-        short_slope = np.polyfit(x_short, y_short, 1)[0]
 
-        # Long regression (50)
-        y_long = closes
-        x_long = np.arange(51)
-        long_slope = np.polyfit(x_long, y_long, 1)[0]
-
-        avg_price = np.mean(closes)
-        short_norm = (short_slope / avg_price) * 100
-        long_norm = (long_slope / avg_price) * 100
+    for i in range(start, n):
+        j = i - start
+        short_norm = short_norms[j]
+        long_norm = long_norms[j]
 
         if short_norm > 0.05 and long_norm > 0 and position == 0:
             shares = int(capital * 0.95 / prices[i])
             if shares > 0:
                 position = shares
                 capital -= shares * prices[i]
-                trades.append(('BUY', i, prices[i]))
+                trade_actions[n_trades] = 1
+                trade_idx[n_trades] = i
+                trade_prices[n_trades] = prices[i]
+                n_trades += 1
         elif (short_norm < -0.05 and long_norm < 0) and position > 0:
             capital += position * prices[i]
-            trades.append(('SELL', i, prices[i]))
+            trade_actions[n_trades] = 2
+            trade_idx[n_trades] = i
+            trade_prices[n_trades] = prices[i]
+            n_trades += 1
             position = 0
         elif short_norm < -0.1 and long_norm > 0.02 and position == 0:
             shares = int(capital * 0.95 / prices[i])
             if shares > 0:
                 position = shares
                 capital -= shares * prices[i]
-                trades.append(('BUY', i, prices[i]))
+                trade_actions[n_trades] = 1
+                trade_idx[n_trades] = i
+                trade_prices[n_trades] = prices[i]
+                n_trades += 1
+
+        portfolio[i + 1] = capital + position * prices[i]
 
-        portfolio.append(capital + position * prices[i])
+    return portfolio, trade_actions[:n_trades], trade_idx[:n_trades], trade_prices[:n_trades]
 
-    portfolio = [INITIAL_CAPITAL] * 50 + portfolio
-    return portfolio[:len(prices)+1], trades
+
+def backtest_hft(prices, volumes, dates):
+    """HFT Momentum backtest — VWAP deviation strategy."""
+    prices = np.asarray(prices, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.float64)
+
+    # Trailing window sums from prefix sums; signal arrays start at bar 30
+    cum_pv = np.cumsum(np.concatenate(([0.0], prices * volumes)))
+    cum_vol = np.cumsum(np.concatenate(([0.0], volumes)))
+
+    # VWAP over bars [i-30, i)
+    vwaps = (cum_pv[30:-1] - cum_pv[:-31]) / (cum_vol[30:-1] - cum_vol[:-31] + 1e-10)
+    vwap_devs = (prices[30:] - vwaps) / vwaps * 100
+
+    # Average volume over bars [i-30, i-1)
+    avg_vols = (cum_vol[29:-2] - cum_vol[:-31]) / 29
+    vol_ratios = volumes[30:] / (avg_vols + 1e-10)
+
+    # Tick momentum (sum of the last 10 price diffs telescopes)
+    tick_moms = prices[30:] - prices[20:-10]
+
+    portfolio, *trades = _hft_loop(prices, vwap_devs, vol_ratios, tick_moms, 30, float(INITIAL_CAPITAL))
+    return portfolio, tuple(trades)
+
+
+def backtest_linreg(prices, dates):
+    """Jim Simons Linear Regression backtest."""
+    prices = np.asarray(prices, dtype=np.float64)
+
+    # Short (20) and long (51) regression slopes over the trailing closes
+    short_slopes = rolling_slope(prices, 20)
+    long_slopes = rolling_slope(prices, 51)
+    avg_prices = pd.Series(prices).rolling(51).mean().values
+    short_norms = (short_slopes[50:] / avg_prices[50:]) * 100
+    long_norms = (long_slopes[50:] / avg_prices[50:]) * 100
+
+    portfolio, *trades = _linreg_loop(prices, short_norms, long_norms, 50, float(INITIAL_CAPITAL))
+    return portfolio, tuple(trades)
+
+
+def _round_trip_wins(trade_actions, trade_prices):
+    """Count (wins, round trips) over BUY immediately followed by SELL.
+
+    The state machines only BUY when flat and only SELL when long, so a round
+    trip is any adjacent BUY/SELL pair in the trade log.
+    """
+    is_buy = trade_actions == 1
+    pairs = is_buy[:-1] & ~is_buy[1:]
+    wins = (trade_prices[1:][pairs] > trade_prices[:-1][pairs]).sum()
+    return int(wins), int(pairs.sum())
 
 
 def compute_metrics(portfolio_values, trades, prices):
-    """Compute performance metrics."""
-    pv = np.array(portfolio_values, dtype=float)
+    """Compute performance metrics; trades is an (actions, indices, prices) array tuple."""
+    pv = np.asarray(portfolio_values, dtype=float)
     returns = np.diff(pv) / pv[:-1]
     returns = returns[np.isfinite(returns)]
 
     total_return = (pv[-1] / pv[0] - 1) * 100
 
     # Win rate from trades
-    wins = 0
-    total_trades = 0
-    i = 0
-    while i < len(trades) - 1:
-        if trades[i][0] == 'BUY' and trades[i+1][0] == 'SELL':
-            if trades[i+1][2] > trades[i][2]:
-                wins += 1
-            total_trades += 1
-            i += 2
-        else:
-            i += 1
+    trade_actions, _, trade_prices = trades
+    wins, total_trades = _round_trip_wins(trade_actions, trade_prices)
 
     win_rate = (wins / total_trades * 100) if total_trades > 0 else 0
 
@@ -430,17 +607,19 @@ def compute_metrics(portfolio_values, trades, prices):
 
 
 def compute_yearly(portfolio_values, trades, dates, strategy_name):
-    """Compute year-by-year metrics."""
-    pv = np.array(portfolio_values[:len(dates)], dtype=float)
+    """Compute year-by-year metrics; trades is an (actions, indices, prices) array tuple."""
+    pv = np.asarray(portfolio_values[:len(dates)], dtype=float)
     yearly = []
 
     if len(dates) == 0:
         return yearly
 
-    years = sorted(set(d.year for d in dates))
+    years_arr = pd.DatetimeIndex(dates).year.to_numpy()
+    trade_actions, trade_idx, trade_prices = trades
+    trade_years = years_arr[np.minimum(trade_idx, len(dates) - 1)]
 
-    for year in years:
-        mask = np.array([d.year == year for d in dates])
+    for year in np.unique(years_arr):
+        mask = years_arr == year
         if mask.sum() < 5:
             continue
 
@@ -450,21 +629,9 @@ def compute_yearly(portfolio_values, trades, dates, strategy_name):
 
         ret = (year_pv[-1] / year_pv[0] - 1) * 100
 
-        # Count trades in this year
-        year_trades = [t for t in trades if dates[min(t[1], len(dates)-1)].year == year]
-        n_buys = sum(1 for t in year_trades if t[0] == 'BUY')
-        # Win count
-        wins = 0
-        total = 0
-        i = 0
-        while i < len(year_trades) - 1:
-            if year_trades[i][0] == 'BUY' and year_trades[i+1][0] == 'SELL':
-                if year_trades[i+1][2] > year_trades[i][2]:
-                    wins += 1
-                total += 1
-                i += 2
-            else:
-                i += 1
+        # Win count over this year's trades
+        year_mask = trade_years == year
+        wins, total = _round_trip_wins(trade_actions[year_mask], trade_prices[year_mask])
 
         wr = (wins / total * 100) if total > 0 else 0
 
@@ -480,7 +647,7 @@ def compute_yearly(portfolio_values, trades, dates, strategy_name):
         pf = gains / losses_val if losses_val > 0 else 99.99
 
         yearly.append({
-            'year': year,
+            'year': int(year),
             'strategy': strategy_name,
             'return_pct': round(ret, 1),
             'trades': total,
@@ -504,30 +671,33 @@ def main():
     volumes = df['Volume'].values
     dates = [d.to_pydatetime() if hasattr(d, 'to_pydatetime') else d for d in df.index]
 
-    state_dim = features.shape[1]
+    # Upload the static feature matrix once; the agent indexes into it per step
+    features_gpu = torch.from_numpy(features).to(DEVICE)
 
     # ======= TRAIN DQN =======
     print(f"\n🚀 Training DQN Agent on {DEVICE.type.upper()} ({len(features)} steps)...")
-    agent = DQNAgent(state_dim)
+    agent = DQNAgent(features_gpu)
     env = TradingEnv(features, prices, INITIAL_CAPITAL)
 
     EPISODES = 50
     for ep in range(EPISODES):
-        state = env.reset()
+        state_idx = env.reset()
         total_reward = 0
         total_loss = 0
         steps = 0
+        updates = 0
 
         while True:
-            action = agent.select_action(state, training=True)
-            next_state, reward, done = env.step(action)
-            agent.buffer.push(state, action, reward, next_state, float(done))
+            action = agent.select_action(state_idx, training=True)
+            next_state_idx, reward, done = env.step(action)
+            agent.buffer.push(state_idx, action, reward, next_state_idx, float(done))
 
-            loss = agent.train_step()
-            total_reward += reward
-            total_loss += loss
             steps += 1
-            state = next_state
+            if steps % agent.update_every == 0:
+                total_loss += agent.train_step()
+                updates += 1
+            total_reward += reward
+            state_idx = next_state_idx
 
             if done:
                 break
@@ -536,7 +706,7 @@ def main():
             final_val = env.portfolio_values[-1]
             ret = (final_val / INITIAL_CAPITAL - 1) * 100
             print(f"   Episode {ep+1}/{EPISODES} | Return: {ret:+.1f}% | "
-                  f"Epsilon: {agent.epsilon:.3f} | Loss: {total_loss/steps:.4f}")
+                  f"Epsilon: {agent.epsilon:.3f} | Loss: {total_loss/max(updates, 1):.4f}")
 
     # Save model
     model_path = os.path.join(RESULTS_DIR, "dqn_model.pth")
@@ -571,11 +741,12 @@ def main():
     def to_equity_curve(portfolio, dates_list):
         # Sample every N days to keep JSON manageable
         step = max(1, len(dates_list) // 500)
-        sampled_dates = [dates_list[i].strftime('%Y-%m-%d') for i in range(0, len(dates_list), step)]
-        sampled_values = [
-            round((portfolio[min(i, len(portfolio)-1)] / INITIAL_CAPITAL - 1) * 100, 2)
-            for i in range(0, len(dates_list), step)
-        ]
+        idx = np.arange(0, len(dates_list), step)
+        portfolio = np.asarray(portfolio, dtype=float)
+        sampled_dates = pd.DatetimeIndex(dates_list[::step]).strftime('%Y-%m-%d').tolist()
+        sampled_values = np.round(
+            (portfolio[np.minimum(idx, len(portfolio) - 1)] / INITIAL_CAPITAL - 1) * 100, 2
+        ).tolist()
         return {'dates': sampled_dates, 'values': sampled_values}
 
     results = {